@@ -1,62 +1,170 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, g
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import Flask, render_template, request, redirect, url_for, session, flash, g, abort
+from flask_caching import Cache
+from flask_compress import Compress
+from flask_session import Session
+import redis
+from jinja2 import FileSystemBytecodeCache
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 import sqlite3
 import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 from datetime import timedelta
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "recipes.db")
+DB_PATH = os.environ.get("DATABASE_PATH", os.path.join(BASE_DIR, "recipes.db"))
+PAGE_SIZE = 50
+LISTING_CACHE_TTL = 5  # seconds
 
 app = Flask(__name__)
 app.secret_key = "change_this_to_a_random_secret_for_prod"  # change for production
 app.permanent_session_lifetime = timedelta(days=7)
 
+# Server-side sessions: the cookie carries only a session id instead of the
+# signed session payload. Falls back to signed cookies when Redis isn't configured.
+REDIS_URL = os.environ.get("REDIS_URL")
+if REDIS_URL:
+    app.config.update(SESSION_TYPE="redis", SESSION_REDIS=redis.Redis.from_url(REDIS_URL))
+    Session(app)
+
+# Anonymous listing pages are served from an in-process cache; responses are gzip-compressed.
+cache = Cache(app, config={"CACHE_TYPE": "SimpleCache"})
+Compress(app)
+
 # ---------------------------
 # Database helpers
 # ---------------------------
+# Each worker thread keeps two long-lived connections: read/write for writes and
+# a private read-only one for reads (see get_read_db). Both keep SQLite's
+# statement cache and page cache warm across requests.
+_local = threading.local()
+
+# Rows come back as namedtuples (one class per column set) so field access is
+# a slot read instead of sqlite3.Row's name lookup.
+_nt_cache = {}
+
+def _nt_factory(cursor, row):
+    fields = tuple(c[0] for c in cursor.description)
+    cls = _nt_cache.get(fields)
+    if cls is None:
+        cls = _nt_cache[fields] = namedtuple("Row", fields, rename=True)
+    return cls(*row)
+
 def get_db():
-    db = getattr(g, "_database", None)
+    db = getattr(_local, "conn", None)
     if db is None:
-        db = g._database = sqlite3.connect(DB_PATH)
-        db.row_factory = sqlite3.Row
+        db = _local.conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=128)
+        db.row_factory = _nt_factory
+        # journal_mode=WAL is persisted by init_db; these are per-connection
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("PRAGMA wal_autocheckpoint=1000")
+        db.execute("PRAGMA temp_store=MEMORY")
+        db.execute("PRAGMA cache_size=-20000")
     return db
 
 @app.teardown_appcontext
 def close_db(error):
-    db = getattr(g, "_database", None)
-    if db is not None:
-        db.close()
+    # Connection stays attached to the thread; just drop any open transaction
+    db = getattr(_local, "conn", None)
+    if db is not None and db.in_transaction:
+        db.rollback()
+
+def _open_read_db():
+    db = sqlite3.connect(f"file:{DB_PATH}?mode=ro", uri=True,
+                         check_same_thread=False, cached_statements=128)
+    db.row_factory = _nt_factory
+    db.execute("PRAGMA temp_store=MEMORY")
+    db.execute("PRAGMA cache_size=-20000")
+    return db
+
+def get_read_db():
+    # Opened lazily and tagged with the pid, so a handle is never reused across fork()
+    db = getattr(_local, "read_conn", None)
+    if db is None or _local.read_pid != os.getpid():
+        db = _local.read_conn = _open_read_db()
+        _local.read_pid = os.getpid()
+    return db
 
 def query_db(query, args=(), one=False):
-    cur = get_db().execute(query, args)
+    cur = get_read_db().execute(query, args)
     rv = cur.fetchall()
     cur.close()
     return (rv[0] if rv else None) if one else rv
 
 def execute_db(query, args=()):
     con = get_db()
-    cur = con.cursor()
-    cur.execute(query, args)
+    cur = con.execute(query, args)
     con.commit()
     return cur.lastrowid
 
+def write_db(query, args=()):
+    # For writes that need no lastrowid; returns the affected row count
+    con = get_db()
+    cur = con.execute(query, args)
+    con.commit()
+    return cur.rowcount
+
+# ---------------------------
+# SQL statements
+# ---------------------------
+# Kept as module-level constants so every call passes the same SQL text and
+# hits the connection's compiled-statement cache.
+# Listings select only the columns they show; the description is cut to the excerpt length.
+# Authors are resolved separately (see usernames_for) rather than joined onto every row.
+_SQL_HOME = ("SELECT id, user_id, title, substr(description, 1, 161) AS description, prep_time, created_at "
+             "FROM recipes ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?")
+_SQL_RECIPES_LIST = ("SELECT id, user_id, title, substr(description, 1, 201) AS description, prep_time, created_at "
+                     "FROM recipes ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?")
+_SQL_RECIPE_DETAIL = "SELECT r.*, u.username FROM recipes r JOIN users u ON r.user_id=u.id WHERE r.id = ?"
+_SQL_RECIPE_FORM = ("SELECT id, title, description, ingredients, instructions, prep_time "
+                    "FROM recipes WHERE id = ? AND user_id = ?")
+_SQL_INSERT_RECIPE = """
+    INSERT INTO recipes (user_id, title, description, ingredients, instructions, prep_time)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+_SQL_UPDATE_RECIPE = """
+    UPDATE recipes
+    SET title = ?, description = ?, ingredients = ?, instructions = ?, prep_time = ?
+    WHERE id = ? AND user_id = ?
+"""
+_SQL_DELETE_RECIPE = "DELETE FROM recipes WHERE id = ? AND user_id = ?"
+_SQL_USER_BY_ID = "SELECT id, username FROM users WHERE id = ?"
+_SQL_USERNAMES_BY_IDS = "SELECT id, username FROM users WHERE id IN (%s)"
+_SQL_USER_BY_NAME = "SELECT * FROM users WHERE username = ?"
+_SQL_INSERT_USER = "INSERT INTO users (username, password_hash) VALUES (?, ?)"
+_SQL_UPDATE_PASSWORD = "UPDATE users SET password_hash = ? WHERE id = ?"
+
+def usernames_for(rows):
+    # One lookup per distinct author on the page instead of a username per joined row
+    ids = list({r.user_id for r in rows})
+    if not ids:
+        return {}
+    users = query_db(_SQL_USERNAMES_BY_IDS % ",".join("?" * len(ids)), ids)
+    return {u.id: u.username for u in users}
+
 # ---------------------------
 # Create DB & tables if not exists
 # ---------------------------
 def init_db():
-    if not os.path.exists(DB_PATH):
-        conn = sqlite3.connect(DB_PATH)
-        cur = conn.cursor()
-        cur.execute("""
-        CREATE TABLE users (
+    # Idempotent: safe on every boot, and schema additions reach existing databases
+    conn = sqlite3.connect(DB_PATH)
+    # WAL lets readers run alongside a writer; the mode is stored in the database file
+    conn.execute("PRAGMA journal_mode=WAL")
+    fresh = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'").fetchone() is None
+    with conn:
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT UNIQUE NOT NULL,
             password_hash TEXT NOT NULL
         );
         """)
-        cur.execute("""
-        CREATE TABLE recipes (
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS recipes (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             user_id INTEGER NOT NULL,
             title TEXT NOT NULL,
@@ -68,8 +176,12 @@ def init_db():
             FOREIGN KEY (user_id) REFERENCES users(id)
         );
         """)
-        conn.commit()
-        conn.close()
+        # users.username is already indexed by its UNIQUE constraint; the ascending
+        # created_at index is scanned in reverse for the DESC listings
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_recipes_user_id ON recipes(user_id);")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_recipes_created_at ON recipes(created_at);")
+    conn.close()
+    if fresh:
         print("Initialized database at", DB_PATH)
 
 init_db()
@@ -77,6 +189,29 @@ init_db()
 # ---------------------------
 # Authentication utils
 # ---------------------------
+# Password hashing is deliberately CPU-heavy; run it on a dedicated pool.
+# argon2-cffi hashes in C with the GIL released, so hashes scale across cores.
+_hasher = PasswordHasher()
+_hash_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+def _verify(pw_hash, password):
+    if not pw_hash.startswith("$argon2"):
+        # Hashes created before the switch to Argon2id (Werkzeug pbkdf2/scrypt)
+        return check_password_hash(pw_hash, password)
+    try:
+        return _hasher.verify(pw_hash, password)
+    except (VerificationError, InvalidHashError):
+        return False
+
+def hash_password(password):
+    return _hash_pool.submit(_hasher.hash, password).result()
+
+def verify_password(pw_hash, password):
+    return _hash_pool.submit(_verify, pw_hash, password).result()
+
+def needs_rehash(pw_hash):
+    return not pw_hash.startswith("$argon2") or _hasher.check_needs_rehash(pw_hash)
+
 def login_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
@@ -86,36 +221,82 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+_MISSING = object()
+
+# Same order as the columns in _SQL_INSERT_RECIPE / _SQL_UPDATE_RECIPE
+RECIPE_FIELDS = ("title", "description", "ingredients", "instructions", "prep_time")
+
+def recipe_form_fields():
+    form = request.form
+    return {k: (form.get(k) or "").strip() for k in RECIPE_FIELDS}
+
+_SQLITE_MAX_INT = 2**63 - 1
+
+def current_page():
+    page = max(request.args.get("page", 1, type=int), 1)
+    # OFFSET must fit in a SQLite INTEGER; anything past that can't be a real page
+    if (page - 1) * PAGE_SIZE > _SQLITE_MAX_INT:
+        abort(404)
+    return page
+
 def current_user():
-    if "user_id" in session:
-        return query_db("SELECT id, username FROM users WHERE id = ?", [session["user_id"]], one=True)
-    return None
+    # Cached on g so repeated calls within one request hit the DB at most once
+    user = g.get("_user_cache", _MISSING)
+    if user is _MISSING:
+        user = None
+        if "user_id" in session:
+            if "username" in session:
+                user = dict(id=session["user_id"], username=session["username"])
+            else:
+                # Sessions issued before username was stored: look it up once
+                row = query_db(_SQL_USER_BY_ID, [session["user_id"]], one=True)
+                if row:
+                    user = dict(id=row.id, username=row.username)
+                    session["username"] = row.username
+        g._user_cache = user
+    return user
 
 # ---------------------------
 # Routes: Auth
 # ---------------------------
+def recipes_changed():
+    # Drop cached listings on every recipe write. The cache is per process;
+    # LISTING_CACHE_TTL bounds staleness across workers.
+    cache.clear()
+
+def _skip_listing_cache():
+    # Logged-in pages differ per session, and pending flash messages are
+    # rendered into the page, so neither can be shared
+    return "user_id" in session or "_flashes" in session
+
 @app.route("/")
+@cache.cached(timeout=LISTING_CACHE_TTL, query_string=True, unless=_skip_listing_cache)
 def home():
     user = current_user()
-    recipes = query_db("SELECT r.*, u.username FROM recipes r JOIN users u ON r.user_id=u.id ORDER BY created_at DESC")
-    return render_template("index.html", recipes=recipes, user=user)
+    page = current_page()
+    recipes = query_db(_SQL_HOME, (PAGE_SIZE, (page - 1) * PAGE_SIZE))
+    return render_template("index.html", recipes=recipes, usernames=usernames_for(recipes), user=user,
+                           page=page, page_size=PAGE_SIZE)
 
 @app.route("/register", methods=["GET", "POST"])
 def register():
     if request.method == "POST":
-        username = request.form.get("username", "").strip()
-        password = request.form.get("password", "")
+        form = request.form
+        username = (form.get("username") or "").strip()
+        password = form.get("password") or ""
         if not username or not password:
             flash("Please enter both username and password.", "danger")
             return redirect(url_for("register"))
-        existing = query_db("SELECT id FROM users WHERE username = ?", [username], one=True)
-        if existing:
+        pw_hash = hash_password(password)
+        try:
+            # users.username is UNIQUE, so the insert itself is the duplicate check
+            user_id = execute_db(_SQL_INSERT_USER, (username, pw_hash))
+        except sqlite3.IntegrityError:
             flash("Username already taken.", "danger")
             return redirect(url_for("register"))
-        pw_hash = generate_password_hash(password)
-        user_id = execute_db("INSERT INTO users (username, password_hash) VALUES (?, ?)", (username, pw_hash))
         session.permanent = True
         session["user_id"] = user_id
+        session["username"] = username
         flash("Registration successful. You're logged in.", "success")
         return redirect(url_for("home"))
     return render_template("register.html")
@@ -123,14 +304,18 @@ def register():
 @app.route("/login", methods=["GET", "POST"])
 def login():
     if request.method == "POST":
-        username = request.form.get("username", "").strip()
-        password = request.form.get("password", "")
-        user = query_db("SELECT * FROM users WHERE username = ?", [username], one=True)
-        if not user or not check_password_hash(user["password_hash"], password):
+        form = request.form
+        username = (form.get("username") or "").strip()
+        password = form.get("password") or ""
+        user = query_db(_SQL_USER_BY_NAME, [username], one=True)
+        if not user or not verify_password(user.password_hash, password):
             flash("Invalid username or password.", "danger")
             return redirect(url_for("login"))
+        if needs_rehash(user.password_hash):
+            write_db(_SQL_UPDATE_PASSWORD, (hash_password(password), user.id))
         session.permanent = True
-        session["user_id"] = user["id"]
+        session["user_id"] = user.id
+        session["username"] = user.username
         flash("Logged in successfully.", "success")
         return redirect(url_for("home"))
     return render_template("login.html")
@@ -145,28 +330,25 @@ def logout():
 # Routes: Recipes CRUD
 # ---------------------------
 @app.route("/recipes")
+@cache.cached(timeout=LISTING_CACHE_TTL, query_string=True, unless=_skip_listing_cache)
 def recipes_list():
     user = current_user()
-    recipes = query_db("SELECT r.*, u.username FROM recipes r JOIN users u ON r.user_id=u.id ORDER BY created_at DESC")
-    return render_template("recipes_list.html", recipes=recipes, user=user)
+    page = current_page()
+    recipes = query_db(_SQL_RECIPES_LIST, (PAGE_SIZE, (page - 1) * PAGE_SIZE))
+    return render_template("recipes_list.html", recipes=recipes, usernames=usernames_for(recipes), user=user,
+                           page=page, page_size=PAGE_SIZE)
 
 @app.route("/recipes/new", methods=["GET", "POST"])
 @login_required
 def recipe_new():
     user = current_user()
     if request.method == "POST":
-        title = request.form.get("title", "").strip()
-        description = request.form.get("description", "").strip()
-        ingredients = request.form.get("ingredients", "").strip()
-        instructions = request.form.get("instructions", "").strip()
-        prep_time = request.form.get("prep_time", "").strip()
-        if not title:
+        fields = recipe_form_fields()
+        if not fields["title"]:
             flash("Title is required.", "danger")
             return redirect(url_for("recipe_new"))
-        execute_db("""
-            INSERT INTO recipes (user_id, title, description, ingredients, instructions, prep_time)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (session["user_id"], title, description, ingredients, instructions, prep_time))
+        execute_db(_SQL_INSERT_RECIPE, (session["user_id"], *fields.values()))
+        recipes_changed()
         flash("Recipe created.", "success")
         return redirect(url_for("recipes_list"))
     return render_template("recipe_form.html", action="Create", recipe=None, user=user)
@@ -174,7 +356,7 @@ def recipe_new():
 @app.route("/recipes/<int:recipe_id>")
 def recipe_detail(recipe_id):
     user = current_user()
-    recipe = query_db("SELECT r.*, u.username FROM recipes r JOIN users u ON r.user_id=u.id WHERE r.id = ?", [recipe_id], one=True)
+    recipe = query_db(_SQL_RECIPE_DETAIL, [recipe_id], one=True)
     if not recipe:
         flash("Recipe not found.", "danger")
         return redirect(url_for("recipes_list"))
@@ -184,46 +366,48 @@ def recipe_detail(recipe_id):
 @login_required
 def recipe_edit(recipe_id):
     user = current_user()
-    recipe = query_db("SELECT * FROM recipes WHERE id = ?", [recipe_id], one=True)
-    if not recipe:
-        flash("Recipe not found.", "danger")
-        return redirect(url_for("recipes_list"))
-    # Authorization: can only edit own recipes (optional)
-    if recipe["user_id"] != session["user_id"]:
-        flash("You are not allowed to edit this recipe.", "danger")
-        return redirect(url_for("recipes_list"))
+    # Authorization: can only edit own recipes; ownership is part of each statement's WHERE
     if request.method == "POST":
-        title = request.form.get("title", "").strip()
-        description = request.form.get("description", "").strip()
-        ingredients = request.form.get("ingredients", "").strip()
-        instructions = request.form.get("instructions", "").strip()
-        prep_time = request.form.get("prep_time", "").strip()
-        if not title:
+        fields = recipe_form_fields()
+        if not fields["title"]:
             flash("Title is required.", "danger")
             return redirect(url_for("recipe_edit", recipe_id=recipe_id))
-        execute_db("""
-            UPDATE recipes
-            SET title = ?, description = ?, ingredients = ?, instructions = ?, prep_time = ?
-            WHERE id = ?
-        """, (title, description, ingredients, instructions, prep_time, recipe_id))
+        updated = write_db(_SQL_UPDATE_RECIPE, (*fields.values(), recipe_id, session["user_id"]))
+        if not updated:
+            flash("Recipe not found or you are not allowed to edit it.", "danger")
+            return redirect(url_for("recipes_list"))
+        recipes_changed()
         flash("Recipe updated.", "success")
         return redirect(url_for("recipe_detail", recipe_id=recipe_id))
+    recipe = query_db(_SQL_RECIPE_FORM, [recipe_id, session["user_id"]], one=True)
+    if not recipe:
+        flash("Recipe not found or you are not allowed to edit it.", "danger")
+        return redirect(url_for("recipes_list"))
     return render_template("recipe_form.html", action="Edit", recipe=recipe, user=user)
 
 @app.route("/recipes/<int:recipe_id>/delete", methods=["POST"])
 @login_required
 def recipe_delete(recipe_id):
-    recipe = query_db("SELECT * FROM recipes WHERE id = ?", [recipe_id], one=True)
-    if not recipe:
-        flash("Recipe not found.", "danger")
-        return redirect(url_for("recipes_list"))
-    if recipe["user_id"] != session["user_id"]:
-        flash("You are not allowed to delete this recipe.", "danger")
+    if not write_db(_SQL_DELETE_RECIPE, (recipe_id, session["user_id"])):
+        flash("Recipe not found or you are not allowed to delete it.", "danger")
         return redirect(url_for("recipes_list"))
-    execute_db("DELETE FROM recipes WHERE id = ?", (recipe_id,))
+    recipes_changed()
     flash("Recipe deleted.", "success")
     return redirect(url_for("recipes_list"))
 
+# ---------------------------
+# Template warm-up
+# ---------------------------
+# Compiled templates persist in the per-user temp dir, and every template is
+# loaded at import so each worker's first render skips parse/compile.
+app.jinja_env.bytecode_cache = FileSystemBytecodeCache()
+
+def _warm_templates():
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+_warm_templates()
+
 # ===== RUN APP =====
 if __name__ == "__main__":
     # Render sets PORT env variable
@@ -0,0 +1,32 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway database before it is imported
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(), "recipes.db")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as recipe_app  # noqa: E402
+
+
+@pytest.fixture
+def app():
+    recipe_app.cache.clear()
+    with recipe_app.get_db() as db:
+        db.execute("DELETE FROM recipes")
+        db.execute("DELETE FROM users")
+    return recipe_app.app
+
+
+@pytest.fixture
+def author(app):
+    client = app.test_client()
+    client.post("/register", data={"username": "author", "password": "pw"})
+    return client
+
+
+@pytest.fixture
+def anon(app):
+    return app.test_client()
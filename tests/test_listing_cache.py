@@ -0,0 +1,60 @@
+import threading
+
+import pytest
+
+import app as recipe_app
+
+
+def new_recipe(client, title):
+    client.post("/recipes/new", data={"title": title})
+    return recipe_app.query_db("SELECT id FROM recipes WHERE title = ?", [title], one=True).id
+
+
+@pytest.mark.parametrize("path", ["/", "/recipes"])
+def test_create_shows_up_for_anonymous_visitors(author, anon, path):
+    new_recipe(author, "Soup")
+    assert "Soup" in anon.get(path).get_data(as_text=True)
+    new_recipe(author, "Stew")
+    assert "Stew" in anon.get(path).get_data(as_text=True)
+
+
+@pytest.mark.parametrize("path", ["/", "/recipes"])
+def test_edit_shows_up_for_anonymous_visitors(author, anon, path):
+    recipe_id = new_recipe(author, "Soup")
+    assert "Soup" in anon.get(path).get_data(as_text=True)
+    author.post(f"/recipes/{recipe_id}/edit", data={"title": "Gazpacho"})
+    body = anon.get(path).get_data(as_text=True)
+    assert "Gazpacho" in body and "Soup" not in body
+
+
+@pytest.mark.parametrize("path", ["/", "/recipes"])
+def test_delete_shows_up_for_anonymous_visitors(author, anon, path):
+    recipe_id = new_recipe(author, "Soup")
+    assert "Soup" in anon.get(path).get_data(as_text=True)
+    author.post(f"/recipes/{recipe_id}/delete")
+    assert "Soup" not in anon.get(path).get_data(as_text=True)
+
+
+def test_write_visible_while_another_thread_is_reading(author, anon):
+    # A read held open on another thread must not pin this thread to an old snapshot.
+    # Several rows, so the reader's statement is still mid-scan after one fetch.
+    for title in ("Soup", "Salad", "Bread"):
+        new_recipe(author, title)
+    started, finish = threading.Event(), threading.Event()
+
+    def long_reader():
+        cur = recipe_app.get_read_db().execute("SELECT id FROM recipes")
+        cur.fetchone()
+        started.set()
+        finish.wait()
+
+    reader = threading.Thread(target=long_reader)
+    reader.start()
+    started.wait()
+    try:
+        new_recipe(author, "Stew")
+        assert "Stew" in anon.get("/").get_data(as_text=True)
+    finally:
+        finish.set()
+        reader.join()
+    assert "Stew" in anon.get("/").get_data(as_text=True)
@@ -0,0 +1,30 @@
+import app as recipe_app
+
+
+def test_empty_homepage(anon):
+    body = anon.get("/").get_data(as_text=True)
+    assert "No recipes yet." in body
+    assert "Older" not in body and "Newer" not in body
+
+
+def test_pages_link_to_each_other(author, anon, monkeypatch):
+    monkeypatch.setattr(recipe_app, "PAGE_SIZE", 1)
+    for title in ("First", "Second"):
+        author.post("/recipes/new", data={"title": title})
+    for path in ("/", "/recipes"):
+        newest = anon.get(path).get_data(as_text=True)
+        assert "Second" in newest and "First" not in newest
+        assert "Older" in newest and "Newer" not in newest
+        oldest = anon.get(path + "?page=2").get_data(as_text=True)
+        assert "First" in oldest and "Newer" in oldest
+
+
+def test_page_past_the_end(author, anon):
+    author.post("/recipes/new", data={"title": "Soup"})
+    body = anon.get("/?page=5").get_data(as_text=True)
+    assert "No more recipes." in body and "No recipes yet." not in body
+
+
+def test_page_number_too_large_for_sqlite(anon):
+    assert anon.get("/?page=99999999999999999999").status_code == 404
+    assert anon.get("/recipes?page=99999999999999999999").status_code == 404